@@ -2,8 +2,12 @@ import streamlit as st
 from pathlib import Path
 import tempfile
 import shutil
+import os
+import json
+import time
+import urllib.request
 
-from video_compression import VideoProcessor
+from video_compression import DEFAULT_DEDUP_THRESHOLD, compress_video_file
 from video_playback import get_video_metadata
 
 st.title("Video Compressor & Player")
@@ -16,6 +20,37 @@ UPLOADS_DIR = OUTPUT_DIR / "uploads"
 OUTPUT_DIR.mkdir(exist_ok=True)
 UPLOADS_DIR.mkdir(exist_ok=True)
 
+# When set (e.g. http://127.0.0.1:8765), compression is handed to job_service.py instead of running here
+JOB_SERVICE_URL = os.environ.get("JOB_SERVICE_URL")
+# seconds to wait for a remote job, queueing included (the service kills a running job after 1800 s by default)
+JOB_POLL_TIMEOUT = float(os.environ.get("JOB_POLL_TIMEOUT", 3600))
+
+
+def run_remote_job(input_path, **options):
+    """Submit a job to the job service and poll it, showing a progress bar.
+    Returns the job's result metadata, or None if the job failed or did not finish within JOB_POLL_TIMEOUT.
+    """
+    request = urllib.request.Request(f"{JOB_SERVICE_URL}/jobs", method="POST",
+                                     data=json.dumps({"input_path": str(input_path), **options}).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as resp:
+        job_id = json.load(resp)["id"]
+
+    progress = st.progress(0.0, text="Queued...")
+    deadline = time.monotonic() + JOB_POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        with urllib.request.urlopen(f"{JOB_SERVICE_URL}/jobs/{job_id}") as resp:
+            job = json.load(resp)
+        progress.progress(job["progress"], text=f"{job['status'].capitalize()}...")
+        if job["status"] == "done":
+            return job["result"]
+        if job["status"] == "failed":
+            st.error(job["error"])
+            return None
+        time.sleep(1)
+    st.error(f"Job {job_id} did not finish within {JOB_POLL_TIMEOUT:.0f} s; it may still be running on the job service.")
+    return None
+
 uploaded_file = st.file_uploader("Upload a video file", type=["mp4", "avi", "mov"])
 
 if uploaded_file is None:
@@ -33,53 +68,59 @@ else:
     method = st.sidebar.selectbox("Method", ["combined", "frameskip", "resolution"], index=0)
     skip_rate = st.sidebar.slider("Skip rate (frames)", 1, 10, 2)
     scale_percent = st.sidebar.slider("Scale percent (resolution)", 10, 100, 50)
-
-    # create processor instance to use class methods
-    processor = VideoProcessor()
+    keep_audio = st.sidebar.checkbox("Keep original audio", value=True)
+    dedup = st.sidebar.checkbox("Remove duplicate frames", value=False)
+    dedup_threshold = st.sidebar.slider("Duplicate tolerance (hash bits)", 0, 32, DEFAULT_DEDUP_THRESHOLD, disabled=not dedup,
+                                        help="Frames whose perceptual hashes differ by at most this many bits are merged. 0 merges only identical hashes.")
+    crop = "auto" if st.sidebar.checkbox("Remove black borders", value=False) else None
 
     if st.button("Compress"):
         try:
-            # load the saved upload into processor
-            ok = processor.load_video(str(temp_path))
-            if not ok:
-                st.error("Failed to load uploaded video for compression")
+            options = dict(method=method, skip_rate=skip_rate, scale_percent=scale_percent, keep_audio=keep_audio, dedup=dedup, dedup_threshold=dedup_threshold, crop=crop)
+            if JOB_SERVICE_URL:
+                result = run_remote_job(temp_path, **options)
             else:
-                out_name = f"{temp_path.stem}_{method}.mp4"
-                out_path = OUTPUT_DIR / out_name
                 # show spinner while compressing
                 with st.spinner("Compressing video... this may take a while"):
-                    ok = processor.compress_to(str(out_path), method=method, skip_rate=skip_rate, scale_percent=scale_percent)
-                processor.close()
-                if not ok:
-                    st.error("Compression failed")
-                else:
-                    st.success("Compression finished")
-                    # optionally create a browser-compatible copy
-                    compat_path = out_path
-
-                    # read metadata using helper
-                    meta = get_video_metadata(str(compat_path))
-
-                    # Display properties
-                    st.subheader("Compressed video properties")
-                    st.write(f"**Path:** {compat_path}")
-                    st.write(f"**Filesize:** {meta['filesize'] / (1024*1024):.2f} MB")
-                    st.write(f"**Resolution:** {meta['width']} x {meta['height']}")
-                    st.write(f"**FPS:** {meta['fps']:.2f}")
-                    st.write(f"**Duration:** {meta['duration']:.2f} seconds")
-                    out_path_obj = Path(compat_path)
-
-                    # # Playback widget - stream file bytes to Streamlit
-                    # st.subheader("Play compressed video")
-                    # if out_path_obj.exists() and out_path_obj.stat().st_size > 0:
-                    #     with open(out_path_obj, "rb") as vf:
-                    #         video_bytes = vf.read()
-                    #     st.video(video_bytes)
-                    # else:
-                    #     st.error("Compressed file not found or is empty; cannot play.")
-
-                    # Download button (serve the compat copy if created)
-                    with open(compat_path, "rb") as f:
-                        st.download_button("Download compressed video", f, file_name=Path(compat_path).name)
+                    _, result = compress_video_file(str(temp_path), OUTPUT_DIR, **options)
+            if result is None:
+                st.error("Compression failed")
+            else:
+                st.success("Compression finished")
+                if result.get("audio_muxed") is False:
+                    st.warning("The original audio could not be copied into the output, so the compressed video is silent.")
+                elif keep_audio and result.get("audio_muxed") is None:
+                    st.info("The source video has no audio track.")
+                # optionally create a browser-compatible copy
+                compat_path = Path(result["path"])
+
+                # read metadata using helper
+                meta = get_video_metadata(str(compat_path))
+
+                # Display properties
+                st.subheader("Compressed video properties")
+                st.write(f"**Path:** {compat_path}")
+                st.write(f"**Filesize:** {meta['filesize'] / (1024*1024):.2f} MB")
+                st.write(f"**Resolution:** {meta['width']} x {meta['height']}")
+                st.write(f"**FPS:** {meta['fps']:.2f}")
+                st.write(f"**Duration:** {meta['duration']:.2f} seconds")
+
+                if result.get("sprite"):
+                    st.subheader("Thumbnails")
+                    st.image(result["sprite"])
+                out_path_obj = Path(compat_path)
+
+                # # Playback widget - stream file bytes to Streamlit
+                # st.subheader("Play compressed video")
+                # if out_path_obj.exists() and out_path_obj.stat().st_size > 0:
+                #     with open(out_path_obj, "rb") as vf:
+                #         video_bytes = vf.read()
+                #     st.video(video_bytes)
+                # else:
+                #     st.error("Compressed file not found or is empty; cannot play.")
+
+                # Download button (serve the compat copy if created)
+                with open(compat_path, "rb") as f:
+                    st.download_button("Download compressed video", f, file_name=Path(compat_path).name)
         except Exception as e:
             st.error(f"Compression failed: {e}")
@@ -0,0 +1,309 @@
+import argparse
+import json
+import multiprocessing as mp
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from video_compression import compress_video_file
+
+# GET /jobs/<id>/<name> downloads: result metadata key and content type
+JOB_FILES = {
+    'result': ('path', 'video/mp4'),
+    'sprite': ('sprite', 'image/jpeg'),
+    'sprite_index': ('sprite_index', 'application/json'),
+}
+JOB_OPTIONS = ('method', 'skip_rate', 'scale_percent', 'keep_audio', 'dedup', 'dedup_threshold', 'crop', 'thumbnails')
+METHODS = ('combined', 'frameskip', 'resolution')
+
+# job processes are spawned, not forked: forking while other threads hold SQLite connections breaks its locking
+_MP = mp.get_context('spawn')
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_db(db_path):
+    """Create the jobs table and requeue jobs left running by a previous (crashed) service"""
+    with _connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input_path TEXT NOT NULL,
+                options TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+        """)
+        conn.execute("UPDATE jobs SET status = 'queued', progress = 0 WHERE status = 'running'")
+
+
+def get_job(db_path, job_id):
+    """Return the job row as a dict (options/result decoded), or None"""
+    with _connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['options'] = json.loads(job['options'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def _update_job(db_path, job_id, **fields):
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    with _connect(db_path) as conn:
+        conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _update_job_with_retry(db_path, job_id, attempts=5, delay=0.5, **fields):
+    """_update_job for final statuses: retry transient SQLite errors so the outcome is not lost"""
+    for attempt in range(attempts):
+        try:
+            return _update_job(db_path, job_id, **fields)
+        except sqlite3.Error as e:
+            if attempt == attempts - 1:
+                raise
+            print(f"✗ Could not record status of job {job_id} ({e}); retrying...")
+            time.sleep(delay)
+
+
+def _run_job(db_path, job_id, input_path, options, output_dir):
+    """Child process entry point: compress one job and record its result in the database"""
+    last = [0.0]
+
+    def report(fraction):
+        # throttle writes to whole percents; a failed progress write must not abort the encode
+        if fraction - last[0] >= 0.01:
+            last[0] = fraction
+            try:
+                _update_job(db_path, job_id, progress=fraction)
+            except sqlite3.Error as e:
+                print(f"✗ Could not record progress of job {job_id}: {e}")
+
+    try:
+        _, metadata = compress_video_file(input_path, Path(output_dir) / job_id, progress_callback=report, **options)
+    except Exception as e:
+        _update_job_with_retry(db_path, job_id, status='failed', error=str(e), finished=time.time())
+    else:
+        _update_job_with_retry(db_path, job_id, status='done', progress=1.0, result=json.dumps(metadata),
+                               finished=time.time())
+
+
+def validate_options(options):
+    """Raise ValueError unless options are known compress_video_file options with valid values"""
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown job options: {', '.join(sorted(unknown))}")
+
+    def is_int(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    if 'method' in options and options['method'] not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if 'skip_rate' in options and not (is_int(options['skip_rate']) and options['skip_rate'] >= 1):
+        raise ValueError("skip_rate must be an integer of at least 1")
+    if 'scale_percent' in options and not (isinstance(options['scale_percent'], (int, float))
+                                           and not isinstance(options['scale_percent'], bool)
+                                           and 1 < options['scale_percent'] <= 100):
+        raise ValueError("scale_percent must be a number above 1 and at most 100")
+    if 'dedup_threshold' in options and not (is_int(options['dedup_threshold']) and options['dedup_threshold'] >= 0):
+        raise ValueError("dedup_threshold must be a non-negative integer")
+    for name in ('keep_audio', 'dedup', 'thumbnails'):
+        if name in options and not isinstance(options[name], bool):
+            raise ValueError(f"{name} must be true or false")
+    crop = options.get('crop')
+    if crop not in (None, 'auto') and not (isinstance(crop, list) and len(crop) == 4
+                                           and all(is_int(v) and v >= 0 for v in crop)):
+        raise ValueError('crop must be null, "auto" or [x, y, width, height]')
+
+
+class JobService:
+    """SQLite-backed job queue drained by a bounded pool of worker threads.
+    Each job runs in its own process so a stuck encode can be killed when it exceeds job_timeout.
+    """
+
+    def __init__(self, db_path, output_dir, workers=2, job_timeout=1800, max_input_mb=2048):
+        self.db_path = Path(db_path)
+        self.output_dir = Path(output_dir)
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.max_input_mb = max_input_mb
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        init_db(self.db_path)
+
+    def submit(self, input_path, options):
+        """Validate and enqueue a job, returning its id"""
+        if not isinstance(input_path, str):
+            raise ValueError("input_path must be a string")
+        src = Path(input_path)
+        if not src.is_file():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+        if src.stat().st_size > self.max_input_mb * 1024 * 1024:
+            raise ValueError(f"Input larger than the {self.max_input_mb} MB per-job limit")
+        validate_options(options)
+
+        job_id = uuid.uuid4().hex
+        with _connect(self.db_path) as conn:
+            conn.execute("INSERT INTO jobs (id, status, input_path, options, created) VALUES (?, 'queued', ?, ?, ?)",
+                         (job_id, str(src.resolve()), json.dumps(options), time.time()))
+        self._wakeup.set()
+        return job_id
+
+    def _claim_next(self):
+        with self._claim_lock, _connect(self.db_path) as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row['id']))
+        return get_job(self.db_path, row['id'])
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim_next()
+                if job is None:
+                    self._wakeup.wait(timeout=1)
+                    self._wakeup.clear()
+                    continue
+                self._run(job)
+            except Exception as e:
+                # a failed database write must not take the worker thread (and its share of capacity) down
+                print(f"✗ Job worker error: {e}")
+                self._stop.wait(timeout=1)
+
+    def _run(self, job):
+        """Run one claimed job in a child process and record its outcome if the child could not"""
+        proc = _MP.Process(target=_run_job, args=(str(self.db_path), job['id'], job['input_path'],
+                                                  job['options'], str(self.output_dir)))
+        proc.start()
+        proc.join(self.job_timeout)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+            _update_job_with_retry(self.db_path, job['id'], status='failed', finished=time.time(),
+                                   error=f"Job exceeded the {self.job_timeout} s time limit")
+        elif get_job(self.db_path, job['id'])['status'] == 'running':
+            _update_job_with_retry(self.db_path, job['id'], status='failed', finished=time.time(),
+                                   error=f"Worker process exited with code {proc.exitcode}")
+
+    def start(self):
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._worker, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API:
+    POST /jobs                 {"input_path": ..., <compress options>} -> {"id", "status"}
+    GET  /jobs/<id>            status, progress (0..1), error and result metadata
+    GET  /jobs/<id>/result     the compressed video file
+    GET  /jobs/<id>/sprite     thumbnail sprite sheet (JPEG); /sprite_index is its JSON index
+    """
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self._send_json(404, {'error': 'Not found'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(payload, dict):
+                return self._send_json(400, {'error': 'Request body must be a JSON object'})
+            input_path = payload.pop('input_path')
+            job_id = self.service.submit(input_path, payload)
+        except KeyError:
+            return self._send_json(400, {'error': 'input_path is required'})
+        except (ValueError, FileNotFoundError) as e:
+            return self._send_json(400, {'error': str(e)})
+        self._send_json(202, {'id': job_id, 'status': 'queued'})
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) not in (2, 3) or parts[0] != 'jobs' or (len(parts) == 3 and parts[2] not in JOB_FILES):
+            return self._send_json(404, {'error': 'Not found'})
+
+        job = get_job(self.service.db_path, parts[1])
+        if job is None:
+            return self._send_json(404, {'error': 'Unknown job'})
+        if len(parts) == 2:
+            return self._send_json(200, job)
+
+        if job['status'] != 'done':
+            return self._send_json(409, {'error': f"Job is {job['status']}"})
+        key, content_type = JOB_FILES[parts[2]]
+        if not job['result'].get(key):
+            return self._send_json(404, {'error': f"Job has no {parts[2]}"})
+        out_path = Path(job['result'][key])
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(out_path.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{out_path.name}"')
+        self.end_headers()
+        with open(out_path, 'rb') as f:
+            while chunk := f.read(1 << 20):
+                self.wfile.write(chunk)
+
+
+def main():
+    root = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Local HTTP job service for video compression")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=str(root / "output" / "jobs.sqlite"))
+    parser.add_argument("--output-dir", default=str(root / "output" / "jobs"))
+    parser.add_argument("--workers", type=int, default=2, help="maximum number of concurrent jobs")
+    parser.add_argument("--job-timeout", type=int, default=1800, help="seconds before a job is killed")
+    parser.add_argument("--max-input-mb", type=int, default=2048, help="largest accepted input file")
+    args = parser.parse_args()
+
+    service = JobService(args.db, args.output_dir, workers=args.workers,
+                         job_timeout=args.job_timeout, max_input_mb=args.max_input_mb)
+    service.start()
+    JobRequestHandler.service = service
+    server = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+    print(f"✓ Job service listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def write_video(path, frames, fps=10, fourcc='mp4v'):
+    """Write BGR frames to a video file and return its path as a string"""
+    height, width = frames[0].shape[:2]
+    out = cv.VideoWriter(str(path), cv.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return str(path)
+
+
+@pytest.fixture
+def sample_video(tmp_path):
+    """3 s, 10 fps, 64x48 clip whose brightness ramps frame by frame"""
+    frames = []
+    for i in range(30):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:, :] = (i * 8, 255 - i * 8, 128)
+        cv.putText(frame, str(i), (5, 30), cv.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        frames.append(frame)
+    return write_video(tmp_path / "sample.mp4", frames)
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import job_service
+from job_service import JobRequestHandler, JobService, get_job, validate_options
+
+
+@pytest.mark.parametrize("options", [
+    {'method': 'combined', 'skip_rate': 3, 'scale_percent': 50.5, 'keep_audio': False},
+    {'dedup': True, 'dedup_threshold': 4, 'crop': 'auto', 'thumbnails': False},
+    {'crop': [0, 10, 320, 180]},
+    {},
+])
+def test_validate_options_accepts_valid_values(options):
+    validate_options(options)
+
+
+@pytest.mark.parametrize("options", [
+    {'method': 'bogus'},
+    {'skip_rate': 'x'},
+    {'skip_rate': 0},
+    {'skip_rate': True},
+    {'scale_percent': 150},
+    {'keep_audio': 'yes'},
+    {'dedup_threshold': -1},
+    {'crop': [0, 0, 10]},
+    {'crop': 'left'},
+    {'unknown': 1},
+])
+def test_validate_options_rejects_bad_values(options):
+    with pytest.raises(ValueError):
+        validate_options(options)
+
+
+def test_progress_write_failure_does_not_abort_job(sample_video, tmp_path, monkeypatch):
+    db = tmp_path / "jobs.sqlite"
+    service = JobService(db, tmp_path / "out")
+    job_id = service.submit(sample_video, {'method': 'resolution', 'keep_audio': False})
+
+    real_update = job_service._update_job
+
+    def flaky_update(db_path, job_id, **fields):
+        if set(fields) == {'progress'}:
+            raise sqlite3.OperationalError("disk I/O error")
+        return real_update(db_path, job_id, **fields)
+
+    monkeypatch.setattr(job_service, '_update_job', flaky_update)
+    job_service._run_job(str(db), job_id, sample_video, {'method': 'resolution', 'keep_audio': False},
+                         str(tmp_path / "out"))
+
+    job = get_job(db, job_id)
+    assert job['status'] == 'done' and job['progress'] == 1.0
+
+
+def test_timeout_status_write_is_retried(sample_video, tmp_path, monkeypatch):
+    db = tmp_path / "jobs.sqlite"
+    service = JobService(db, tmp_path / "out", job_timeout=0.01)
+    job_id = service.submit(sample_video, {})
+
+    real_update = job_service._update_job
+    failures = []
+
+    def flaky_update(db_path, job_id, **fields):
+        if 'error' in fields and not failures:
+            failures.append(fields)
+            raise sqlite3.OperationalError("database is locked")
+        return real_update(db_path, job_id, **fields)
+
+    monkeypatch.setattr(job_service, '_update_job', flaky_update)
+    service._run(service._claim_next())
+
+    job = get_job(db, job_id)
+    assert failures and job['status'] == 'failed' and 'time limit' in job['error']
+
+
+def test_worker_survives_database_errors(sample_video, tmp_path):
+    db = tmp_path / "jobs.sqlite"
+    service = JobService(db, tmp_path / "out", workers=1, job_timeout=120)
+    real_claim = service._claim_next
+    calls = []
+
+    def flaky_claim():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("disk I/O error")
+        return real_claim()
+
+    service._claim_next = flaky_claim
+    job_id = service.submit(sample_video, {'method': 'frameskip', 'keep_audio': False, 'thumbnails': False})
+    service.start()
+    try:
+        deadline = time.time() + 120
+        while time.time() < deadline and get_job(db, job_id)['status'] in ('queued', 'running'):
+            time.sleep(0.2)
+    finally:
+        service.stop()
+    assert len(calls) > 1 and get_job(db, job_id)['status'] == 'done'
+
+
+@pytest.fixture
+def server(tmp_path):
+    service = JobService(tmp_path / "jobs.sqlite", tmp_path / "out", workers=2, job_timeout=120)
+    service.start()
+    JobRequestHandler.service = service
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), JobRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    service.stop()
+
+
+def _post(url, body):
+    request = urllib.request.Request(f"{url}/jobs", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_post_rejects_bad_requests(server, sample_video):
+    assert _post(server, b'["a"]')[0] == 400
+    assert _post(server, b'not json')[0] == 400
+    assert _post(server, json.dumps({'method': 'combined'}).encode())[0] == 400
+    assert _post(server, json.dumps({'input_path': sample_video, 'skip_rate': 'x'}).encode())[0] == 400
+
+
+def test_jobs_run_concurrently_with_polling(server, sample_video):
+    ids = []
+    for _ in range(3):
+        status, body = _post(server, json.dumps({'input_path': sample_video, 'method': 'frameskip',
+                                                 'keep_audio': False}).encode())
+        assert status == 202
+        ids.append(body['id'])
+
+    deadline = time.time() + 120
+    jobs = {}
+    while time.time() < deadline:
+        for job_id in ids:
+            with urllib.request.urlopen(f"{server}/jobs/{job_id}") as resp:
+                jobs[job_id] = json.load(resp)
+        if all(job['status'] in ('done', 'failed') for job in jobs.values()):
+            break
+        time.sleep(0.2)
+
+    assert [job['status'] for job in jobs.values()] == ['done'] * 3, [job['error'] for job in jobs.values()]
+    with urllib.request.urlopen(f"{server}/jobs/{ids[0]}/result") as resp:
+        assert resp.headers['Content-Type'] == 'video/mp4' and len(resp.read()) > 0
+    with urllib.request.urlopen(f"{server}/jobs/{ids[0]}/sprite") as resp:
+        assert resp.headers['Content-Type'] == 'image/jpeg'
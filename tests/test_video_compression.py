@@ -0,0 +1,242 @@
+import json
+import subprocess
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+import video_compression
+from conftest import write_video
+from video_compression import (DEFAULT_DEDUP_THRESHOLD, VideoProcessor, _find_ffmpeg, compress_video_file,
+                               frame_hash, hash_distance, retime_mp4)
+
+
+def test_generate_thumbnails_writes_sprite_and_index(sample_video, tmp_path):
+    proc = VideoProcessor()
+    assert proc.load_video(sample_video)
+    sprite = tmp_path / "sprite.png"
+    try:
+        assert proc.generate_thumbnails(str(sprite), count=4, columns=2, thumb_width=32)
+    finally:
+        proc.close()
+
+    sheet = cv.imread(str(sprite))
+    assert sheet.shape[:2] == (2 * 24, 2 * 32)
+    index = json.loads(sprite.with_suffix('.json').read_text())
+    assert index['columns'] == 2 and index['rows'] == 2
+    times = [t['time'] for t in index['thumbnails']]
+    assert times == sorted(times) and times[0] > 0
+
+
+def test_generate_thumbnails_rejects_non_image_extension(sample_video, tmp_path):
+    proc = VideoProcessor()
+    assert proc.load_video(sample_video)
+    try:
+        assert not proc.generate_thumbnails(str(tmp_path / "sprite.json"))
+        assert not proc.generate_thumbnails(str(tmp_path / "sprite"))
+    finally:
+        proc.close()
+
+
+def test_compress_video_file_reports_sprite(sample_video, tmp_path):
+    out_path, meta = compress_video_file(sample_video, tmp_path / "out", method='resolution', keep_audio=False)
+    assert Path(out_path).exists()
+    assert Path(meta['sprite']).exists() and Path(meta['sprite_index']).exists()
+
+    _, meta = compress_video_file(sample_video, tmp_path / "out2", method='resolution', keep_audio=False,
+                                  thumbnails=False)
+    assert meta['sprite'] is None and meta['sprite_index'] is None
+
+
+def _ffmpeg_or_skip():
+    ffmpeg = _find_ffmpeg()
+    if ffmpeg is None:
+        pytest.skip("ffmpeg not available")
+    return ffmpeg
+
+
+def test_mux_source_audio_encodes_only_unsupported_codecs(sample_video, tmp_path):
+    ffmpeg = _ffmpeg_or_skip()
+    source = tmp_path / "adpcm.avi"
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', sample_video, '-f', 'lavfi', '-i', 'sine=duration=3',
+                    '-map', '0:v', '-map', '1:a', '-c:v', 'copy', '-c:a', 'adpcm_ima_wav', str(source)], check=True)
+
+    proc = VideoProcessor()
+    assert proc.load_video(str(source))
+    try:
+        out = str(tmp_path / "out.mp4")
+        assert proc.compress_to(out, method='frameskip', skip_rate=2)
+        assert proc.audio_muxed is True
+    finally:
+        proc.close()
+    cap = cv.VideoCapture(out)
+    assert cap.isOpened()
+    cap.release()
+
+
+def test_source_without_audio_is_not_reported_as_muxed(sample_video, tmp_path):
+    _ffmpeg_or_skip()
+    _, meta = compress_video_file(sample_video, tmp_path, method='frameskip', keep_audio=True, thumbnails=False)
+    assert meta['audio_muxed'] is None
+
+
+def test_mux_failure_is_reported(sample_video, tmp_path):
+    _ffmpeg_or_skip()
+    proc = VideoProcessor()
+    assert proc.load_video(sample_video)
+    try:
+        out = tmp_path / "out.mp4"
+        # the capture stays open, but the source path handed to ffmpeg no longer exists
+        proc.video_path = str(tmp_path / "missing.mp4")
+        assert proc.compress_to(str(out), method='frameskip')
+        assert proc.audio_muxed is False
+        assert out.stat().st_size > 0
+    finally:
+        proc.close()
+
+
+def _flat(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_frame_hash_matches_identical_frames():
+    frame = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    assert hash_distance(frame_hash(frame), frame_hash(frame.copy())) == 0
+
+
+def test_frame_hash_separates_brightness_and_colour():
+    black, white = frame_hash(_flat(0)), frame_hash(_flat(255))
+    assert hash_distance(black, white) > 0
+    red, green, blue = (frame_hash(_flat(c)) for c in ((0, 0, 255), (0, 255, 0), (255, 0, 0)))
+    assert hash_distance(red, green) > 0 and hash_distance(green, blue) > 0 and hash_distance(red, blue) > 0
+
+
+def test_dedup_keeps_black_white_and_fade_frames(tmp_path):
+    fade = [_flat(v) for v in range(0, 256, 16)]
+    frames = [_flat(0)] * 5 + [_flat(255)] * 5 + fade
+    video = write_video(tmp_path / "flat.mp4", frames)
+
+    proc = VideoProcessor()
+    assert proc.load_video(video)
+    try:
+        assert proc.compress_with_frame_skip(str(tmp_path / "out.mp4"), skip_rate=1, dedup=True)
+    finally:
+        proc.close()
+    # the black and white runs collapse to one frame each, every fade step is kept
+    assert proc.duplicates_removed == 8
+    assert proc._frame_runs == [5, 5] + [1] * len(fade)
+
+
+def _frame_times(path):
+    cap = cv.VideoCapture(path)
+    times = []
+    while cap.read()[0]:
+        times.append(round(cap.get(cv.CAP_PROP_POS_MSEC)))
+    cap.release()
+    return times
+
+
+def test_retime_mp4_handles_thousands_of_runs(tmp_path):
+    # 4000 runs of alternating length 1 and 2: far beyond what fits in a command-line expression
+    runs = [1 + i % 2 for i in range(4000)]
+    video = write_video(tmp_path / "many.mp4", [_flat(i % 250) for i in range(len(runs))], fps=100)
+    retime_mp4(video, runs)
+
+    times = _frame_times(video)
+    assert times == [round(10 * t) for t in np.concatenate([[0], np.cumsum(runs)[:-1]])]
+    cap = cv.VideoCapture(video)
+    assert cap.get(cv.CAP_PROP_FRAME_COUNT) == len(runs)
+    cap.release()
+
+
+def test_dedup_output_keeps_source_timing(tmp_path):
+    frames = [_flat(0)] * 10 + [_flat(255)] * 20 + [_flat(128)] * 10
+    video = write_video(tmp_path / "slides.mp4", frames)
+
+    proc = VideoProcessor()
+    assert proc.load_video(video)
+    out = str(tmp_path / "out.mp4")
+    try:
+        assert proc.compress_with_frame_skip(out, skip_rate=1, dedup=True)
+    finally:
+        proc.close()
+
+    assert _frame_times(out) == [0, 1000, 3000]
+
+
+def test_dedup_collapses_lossy_static_slide(tmp_path):
+    rng = np.random.default_rng(0)
+    slide = np.full((240, 320, 3), 230, dtype=np.uint8)
+    for i in range(6):
+        cv.putText(slide, f"Slide text line {i}", (10, 30 + 35 * i), cv.FONT_HERSHEY_SIMPLEX, 0.6, (20, 20, 20), 1)
+    # +-2 noise on every frame, then lossy mp4v coding on top
+    frames = [np.clip(slide + rng.integers(-2, 3, slide.shape), 0, 255).astype(np.uint8) for _ in range(60)]
+    video = write_video(tmp_path / "static.mp4", frames, fps=30)
+
+    proc = VideoProcessor()
+    assert proc.load_video(video)
+    try:
+        assert proc.compress_with_frame_skip(str(tmp_path / "out.mp4"), skip_rate=1, dedup=True)
+    finally:
+        proc.close()
+    assert DEFAULT_DEDUP_THRESHOLD > 0
+    assert proc.duplicates_removed == 59
+
+
+def test_failed_retime_fails_compression(sample_video, tmp_path, monkeypatch):
+    def broken_retime(path, runs):
+        raise ValueError("unsupported file")
+
+    monkeypatch.setattr(video_compression, 'retime_mp4', broken_retime)
+    proc = VideoProcessor()
+    assert proc.load_video(write_video(tmp_path / "still.mp4", [_flat(40)] * 10))
+    try:
+        assert not proc.compress_to(str(tmp_path / "out.mp4"), method='frameskip', skip_rate=1, dedup=True)
+    finally:
+        proc.close()
+
+
+def test_compress_video_file_reports_progress(sample_video, tmp_path):
+    fractions = []
+    compress_video_file(sample_video, tmp_path, method='combined', keep_audio=False, thumbnails=False,
+                        progress_callback=fractions.append)
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+
+def test_detect_borders_ignores_noise_in_bars(tmp_path):
+    rng = np.random.default_rng(1)
+    frames = []
+    for _ in range(20):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[30:210] = rng.integers(60, 200, (180, 320, 3), dtype=np.uint8)
+        # sparse bright noise inside the letterbox bars
+        noise = rng.random((240, 320)) < 0.01
+        noise[30:210] = False
+        frame[noise] = 255
+        frames.append(frame)
+    # lossless-ish intra coding so the noise survives into the decoded frames
+    video = write_video(tmp_path / "letterbox.avi", frames, fourcc='MJPG')
+
+    proc = VideoProcessor()
+    assert proc.load_video(video)
+    try:
+        assert proc.detect_borders() == (0, 30, 320, 180)
+    finally:
+        proc.close()
+
+
+def test_explicit_crop_is_rounded_to_even_size(sample_video, tmp_path):
+    proc = VideoProcessor()
+    assert proc.load_video(sample_video)
+    out = str(tmp_path / "crop.mp4")
+    try:
+        assert proc._resolve_roi((1, 1, 41, 27)) == (1, 1, 40, 26)
+        assert proc.compress_to(out, method='frameskip', crop=(1, 1, 41, 27), keep_audio=False)
+    finally:
+        proc.close()
+    cap = cv.VideoCapture(out)
+    ret, frame = cap.read()
+    cap.release()
+    assert ret and frame.shape[:2] == (26, 40)
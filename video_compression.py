@@ -2,14 +2,219 @@ import cv2 as cv
 import numpy as np
 import moviepy as mp
 import tkinter as tk
+import json
+import os
+import shutil
+import struct
+import subprocess
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+
+def _find_ffmpeg():
+    """Locate an ffmpeg binary: the one bundled with imageio-ffmpeg (installed with MoviePy) or one on PATH"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg')
+
+
+SPRITE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# ffmpeg messages meaning the copied audio codec is not allowed in the output container
+AUDIO_CODEC_ERRORS = ('Could not find tag for codec', 'not currently supported in container')
+# ffmpeg message meaning the source has no audio stream to map
+NO_AUDIO_ERROR = "matches no streams"
+
+
+# thresholds for the thermometer-coded channel means in frame_hash: one bit per 4 brightness levels
+_MEAN_LEVELS = np.arange(2, 256, 4)
+# a dHash bit is only set when a pixel is brighter than its neighbour by more than this many grey levels,
+# so flat areas (slide backgrounds) hash to stable zeros instead of following codec noise
+_DHASH_MARGIN = 2
+# default number of differing hash bits still treated as a duplicate: absorbs lossy-codec noise on static
+# slides and screen captures (typically <= 5 bits) while a 16-level brightness step (12 bits) is kept
+DEFAULT_DEDUP_THRESHOLD = 6
+
+
+def frame_hash(frame, hash_size=16):
+    """Perceptual hash of a frame as a packed uint8 array.
+    The first hash_size*hash_size bits are a difference hash (dHash): the frame is shrunk to
+    (hash_size+1) x hash_size grey pixels and each bit records whether a pixel is brighter than its
+    right-hand neighbour by more than a small noise margin. dHash ignores overall brightness (every
+    flat frame hashes the same), so it is followed by a thermometer code of each channel's mean with 4-level steps; the Hamming distance
+    between two codes grows with the difference in brightness/colour.
+    """
+    # strided view first so the colour conversion and area resize only touch a few thousand pixels
+    step = max(1, min(frame.shape[0] // (hash_size * 4), frame.shape[1] // ((hash_size + 1) * 4)))
+    sampled = np.ascontiguousarray(frame[::step, ::step])
+    grey = cv.cvtColor(sampled, cv.COLOR_BGR2GRAY) if sampled.ndim == 3 else sampled
+    small = cv.resize(grey, (hash_size + 1, hash_size), interpolation=cv.INTER_AREA).astype(np.int16)
+    means = sampled.reshape(-1, sampled.shape[2] if sampled.ndim == 3 else 1).mean(axis=0)
+    return np.packbits(np.concatenate([(small[:, 1:] - small[:, :-1] > _DHASH_MARGIN).ravel(),
+                                       (means[:, None] > _MEAN_LEVELS).ravel()]))
+
+
+def hash_distance(hash_a, hash_b):
+    """Number of differing bits between two frame hashes"""
+    return int(np.unpackbits(np.bitwise_xor(hash_a, hash_b)).sum())
+
+
+def _even_size(width, height):
+    """Round a frame size down to even dimensions, as the yuv420 encoder requires"""
+    return width // 2 * 2, height // 2 * 2
+
+
+_MP4_CONTAINERS = (b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts')
+
+
+def _mp4_boxes(data):
+    """Yield (type, payload) for the boxes in an MP4 byte string"""
+    off = 0
+    while off < len(data):
+        size, typ = struct.unpack('>I4s', data[off:off + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[off + 8:off + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - off
+        yield typ, data[off + header:off + size]
+        off += size
+
+
+def _mp4_box(typ, payload):
+    return struct.pack('>I4s', 8 + len(payload), typ) + payload
+
+
+def _set_duration(payload, offsets, duration):
+    """Overwrite a version 0/1 duration field; offsets gives its byte offset for each version"""
+    version = payload[0]
+    off = offsets[version]
+    fmt = '>Q' if version == 1 else '>I'
+    return payload[:off] + struct.pack(fmt, duration) + payload[off + struct.calcsize(fmt):]
+
+
+def _timescale(payload):
+    # mvhd/mdhd: timescale follows the creation/modification times (32-bit in v0, 64-bit in v1)
+    off = 20 if payload[0] == 1 else 12
+    return struct.unpack('>I', payload[off:off + 4])[0]
+
+
+def _is_video_trak(payload):
+    for typ, mdia in _mp4_boxes(payload):
+        if typ == b'mdia':
+            return any(t == b'hdlr' and p[8:12] == b'vide' for t, p in _mp4_boxes(mdia))
+    return False
+
+
+def _rewrite_boxes(data, edit_leaf):
+    """Rebuild the boxes in data, passing every leaf box of the video track (and mvhd) through edit_leaf"""
+    out = []
+    for typ, payload in _mp4_boxes(data):
+        if typ == b'trak' and not _is_video_trak(payload):
+            out.append(_mp4_box(typ, payload))
+        elif typ in _MP4_CONTAINERS:
+            out.append(_mp4_box(typ, _rewrite_boxes(payload, edit_leaf)))
+        else:
+            out.append(_mp4_box(typ, edit_leaf(typ, payload)))
+    return b''.join(out)
+
+
+def _find_moov(f):
+    """Return (offset, size) of the top-level moov box in an open MP4 file"""
+    file_size = f.seek(0, os.SEEK_END)
+    off = 0
+    while off < file_size:
+        f.seek(off)
+        size, typ = struct.unpack('>I4s', f.read(8))
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+        elif size == 0:
+            size = file_size - off
+        if typ == b'moov':
+            return off, size
+        off += size
+    raise ValueError("No moov box found")
+
+
+def retime_mp4(path, runs):
+    """Show video sample N of the constant-frame-rate MP4 at path for runs[N] times its current duration.
+    Only the sample-timing table (stts) and the duration fields in moov change, so the cost depends on
+    the number of frames, not on the media size, and the media data is not touched. The old moov is
+    truncated away (if it ends the file) or blanked to a free box, and the rewritten one is appended,
+    so chunk offsets stay valid.
+    """
+    with open(path, 'r+b') as f:
+        moov_off, moov_size = _find_moov(f)
+        f.seek(moov_off)
+        moov = f.read(moov_size)
+        moov_payload = next(_mp4_boxes(moov))[1]
+
+        # first pass: timescales and the current constant sample duration
+        info = {}
+
+        def collect(typ, payload):
+            if typ == b'mvhd':
+                info['movie_timescale'] = _timescale(payload)
+            elif typ == b'mdhd':
+                info['media_timescale'] = _timescale(payload)
+            elif typ == b'stts':
+                count = struct.unpack('>I', payload[4:8])[0]
+                entries = [struct.unpack('>II', payload[8 + 8 * i:16 + 8 * i]) for i in range(count)]
+                if len({delta for _, delta in entries}) != 1 or sum(n for n, _ in entries) != len(runs):
+                    raise ValueError("Video track is not constant frame rate with one sample per run")
+                info['delta'] = entries[0][1]
+            return payload
+
+        _rewrite_boxes(moov_payload, collect)
+        media_duration = sum(runs) * info['delta']
+        movie_duration = round(media_duration * info['movie_timescale'] / info['media_timescale'])
+
+        # run-length encode the new per-sample durations
+        entries = []
+        for run in runs:
+            if entries and entries[-1][1] == run * info['delta']:
+                entries[-1][0] += 1
+            else:
+                entries.append([1, run * info['delta']])
+
+        def retime(typ, payload):
+            if typ == b'stts':
+                return payload[:4] + struct.pack('>I', len(entries)) + b''.join(
+                    struct.pack('>II', n, d) for n, d in entries)
+            if typ == b'mdhd':
+                return _set_duration(payload, {0: 16, 1: 24}, media_duration)
+            if typ == b'mvhd':
+                return _set_duration(payload, {0: 16, 1: 24}, movie_duration)
+            if typ == b'tkhd':
+                return _set_duration(payload, {0: 20, 1: 28}, movie_duration)
+            if typ == b'elst' and struct.unpack('>I', payload[4:8])[0] == 1:
+                return _set_duration(payload, {0: 8, 1: 8}, movie_duration)
+            return payload
+
+        new_moov = _mp4_box(b'moov', _rewrite_boxes(moov_payload, retime))
+
+        if moov_off + moov_size == f.seek(0, os.SEEK_END):
+            f.truncate(moov_off)
+        else:
+            f.seek(moov_off + 4)
+            f.write(b'free')
+        f.seek(0, os.SEEK_END)
+        f.write(new_moov)
+
+
 class VideoProcessor:
     def __init__(self):
         self.cap = None
         self.video_path = None
         self.video_properties = {}
+        self.duplicates_removed = 0
+        self._last_hash = None
+        self._frame_runs = []
+        self.progress_callback = None
+        self.audio_muxed = None
 
     def load_video(self, video_path):
         """Load video and extract properties"""
@@ -91,8 +296,127 @@ class VideoProcessor:
             raise IOError(f"Could not open video writer for {output_path}")
         return out
 
-    def compress_with_frame_skip(self, output_path, skip_rate=2):
-        """Compress video by skipping frames"""
+    def _report_progress(self, frame_idx):
+        """Pass the fraction of source frames read to progress_callback, about once per percent"""
+        total = self.video_properties.get('frame_count', 0)
+        if self.progress_callback is None or total <= 0:
+            return
+        if frame_idx % max(1, total // 100) == 0:
+            self.progress_callback(min(1.0, frame_idx / total))
+
+    def _reset_dedup(self):
+        self.duplicates_removed = 0
+        self._last_hash = None
+        self._frame_runs = []
+
+    def _is_duplicate(self, frame, threshold):
+        """Return True if frame's hash is within threshold bits of the last kept frame's (see frame_hash).
+        Duplicates extend the display run of the last kept frame instead of being written.
+        """
+        h = frame_hash(frame)
+        if self._last_hash is not None and hash_distance(h, self._last_hash) <= threshold:
+            self._frame_runs[-1] += 1
+            self.duplicates_removed += 1
+            return True
+        self._last_hash = h
+        self._frame_runs.append(1)
+        return False
+
+    def _apply_frame_runs(self, output_path):
+        """Stretch each written frame over its duplicate run by rewriting the MP4 sample timing table.
+        cv.VideoWriter only writes constant frame rate, so collapsed runs would otherwise shorten the video.
+        """
+        if self.duplicates_removed == 0:
+            return True
+
+        try:
+            retime_mp4(output_path, self._frame_runs)
+            return True
+        except Exception as e:
+            print(f"✗ Error while retiming deduplicated frames: {e}")
+            return False
+
+    def detect_borders(self, sample_count=10, threshold=16):
+        """Find the region inside black letterbox/pillarbox bars.
+        Samples sample_count evenly spaced frames and averages the brightest channel along every row and
+        column of each frame; a row/column is picture if its mean exceeds threshold in any sampled frame.
+        Averaging keeps isolated noisy pixels inside the bars from counting as picture.
+        Returns (x, y, width, height) with even width/height, or None if no frames can be read
+        or the whole picture is black.
+        """
+        if self.cap is None or not self.cap.isOpened():
+            print("✗ No video loaded or video cannot be opened.")
+            return None
+
+        frame_count = max(1, self.video_properties['frame_count'])
+        row_means = None
+        col_means = None
+        for i in range(sample_count):
+            self.cap.set(cv.CAP_PROP_POS_FRAMES, int((i + 0.5) * frame_count / sample_count))
+            ret, frame = self.cap.read()
+            if not ret:
+                continue
+            peak = frame.max(axis=2)
+            rows_i, cols_i = peak.mean(axis=1), peak.mean(axis=0)
+            row_means = rows_i if row_means is None else np.maximum(row_means, rows_i)
+            col_means = cols_i if col_means is None else np.maximum(col_means, cols_i)
+
+        if row_means is None:
+            print("✗ Could not read any frames for border detection.")
+            return None
+
+        rows = np.flatnonzero(row_means > threshold)
+        cols = np.flatnonzero(col_means > threshold)
+        if rows.size == 0 or cols.size == 0:
+            return None
+
+        x, y = int(cols[0]), int(rows[0])
+        width, height = _even_size(int(cols[-1]) - x + 1, int(rows[-1]) - y + 1)
+        print(f"Detected content region: {width}x{height} at ({x}, {y}).")
+        return x, y, width, height
+
+    def _resolve_roi(self, crop):
+        """Turn a compress_to crop option (None, 'auto' or (x, y, width, height)) into an ROI tuple or None"""
+        if crop is None:
+            return None
+        if crop == 'auto':
+            roi = self.detect_borders()
+            if roi is None or roi == (0, 0, self.video_properties['width'], self.video_properties['height']):
+                return None
+            return roi
+
+        x, y, width, height = (int(v) for v in crop)
+        if x < 0 or y < 0 or width < 2 or height < 2 \
+                or x + width > self.video_properties['width'] or y + height > self.video_properties['height']:
+            raise ValueError(f"Crop region {tuple(crop)} is outside the "
+                             f"{self.video_properties['width']}x{self.video_properties['height']} frame")
+        width, height = _even_size(width, height)
+        if (width, height) != (int(crop[2]), int(crop[3])):
+            print(f"Crop region rounded down to even size {width}x{height}.")
+        return x, y, width, height
+
+    def _frame_size(self, roi):
+        """Width and height of the frames fed to the encoder after the optional ROI crop"""
+        if roi is None:
+            return self.video_properties['width'], self.video_properties['height']
+        return roi[2], roi[3]
+
+    @staticmethod
+    def _apply_roi(frame, roi):
+        # basic slicing returns a view, so cropping costs no copy before cv.resize / the writer
+        if roi is None:
+            return frame
+        x, y, width, height = roi
+        return frame[y:y + height, x:x + width]
+
+    def compress_with_frame_skip(self, output_path, skip_rate=2, dedup=False,
+                                 dedup_threshold=DEFAULT_DEDUP_THRESHOLD, roi=None):
+        """Compress video by skipping frames.
+        With dedup, frames whose perceptual hash is within dedup_threshold bits of the last kept frame
+        are dropped and the kept frame is shown for the whole run. The default (DEFAULT_DEDUP_THRESHOLD)
+        absorbs lossy-codec noise on static content; 0 collapses only frames with identical hashes.
+        roi=(x, y, width, height) keeps only that region of each frame.
+        """
         if self.cap is None or not self.cap.isOpened():
             print("✗ No video loaded or video cannot be opened.")
             return False
@@ -104,11 +428,11 @@ class VideoProcessor:
         print(f"Starting frame skip compression (skip every {skip_rate} frames) to {output_path}...")
 
         new_fps = self.video_properties['fps'] / skip_rate
-        width = self.video_properties['width']
-        height = self.video_properties['height']
+        width, height = self._frame_size(roi)
 
         out = self._get_video_writer(output_path, new_fps, width, height)
         self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+        self._reset_dedup()
         frame_idx = 0
         processed_frames = 0
 
@@ -117,12 +441,19 @@ class VideoProcessor:
                 ret, frame = self.cap.read()
                 if not ret:
                     break
+                frame = self._apply_roi(frame, roi)
 
-                if frame_idx % skip_rate == 0:
+                if frame_idx % skip_rate == 0 and not (dedup and self._is_duplicate(frame, dedup_threshold)):
                     out.write(frame)
                     processed_frames += 1
                 frame_idx += 1
-            print(f"✓ Frame skip compression complete. Wrote {processed_frames} frames.")
+                self._report_progress(frame_idx)
+            out.release()
+            if not self._apply_frame_runs(output_path):
+                print("✗ Frame skip compression failed: deduplicated frames could not be retimed.")
+                return False
+            print(f"✓ Frame skip compression complete. Wrote {processed_frames} frames"
+                  f" ({self.duplicates_removed} duplicates removed).")
             return True
         except Exception as e:
             print(f"✗ Error during frame skip compression: {e}")
@@ -130,8 +461,9 @@ class VideoProcessor:
         finally:
             out.release()
 
-    def compress_with_resolution(self, output_path, scale_percent=50):
-        """Compress video by reducing resolution"""
+    def compress_with_resolution(self, output_path, scale_percent=50, dedup=False,
+                                 dedup_threshold=DEFAULT_DEDUP_THRESHOLD, roi=None):
+        """Compress video by reducing resolution, optionally collapsing duplicate frames"""
         if self.cap is None or not self.cap.isOpened():
             print("✗ No video loaded or video cannot be opened.")
             return False
@@ -142,13 +474,16 @@ class VideoProcessor:
 
         print(f"Starting resolution compression ({scale_percent}% scale) to {output_path}...")
 
-        new_width = int(self.video_properties['width'] * scale_percent / 100)
-        new_height = int(self.video_properties['height'] * scale_percent / 100)
+        width, height = self._frame_size(roi)
+        new_width = int(width * scale_percent / 100)
+        new_height = int(height * scale_percent / 100)
 
         fps = self.video_properties['fps']
 
         out = self._get_video_writer(output_path, fps, new_width, new_height)
         self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+        self._reset_dedup()
+        frame_idx = 0
         processed_frames = 0
 
         try:
@@ -156,11 +491,21 @@ class VideoProcessor:
                 ret, frame = self.cap.read()
                 if not ret:
                     break
+                frame = self._apply_roi(frame, roi)
 
+                frame_idx += 1
+                self._report_progress(frame_idx)
+                if dedup and self._is_duplicate(frame, dedup_threshold):
+                    continue
                 resized_frame = cv.resize(frame, (new_width, new_height), interpolation=cv.INTER_AREA)
                 out.write(resized_frame)
                 processed_frames += 1
-            print(f"✓ Resolution compression complete. Wrote {processed_frames} frames.")
+            out.release()
+            if not self._apply_frame_runs(output_path):
+                print("✗ Resolution compression failed: deduplicated frames could not be retimed.")
+                return False
+            print(f"✓ Resolution compression complete. Wrote {processed_frames} frames"
+                  f" ({self.duplicates_removed} duplicates removed).")
             return True
         except Exception as e:
             print(f"✗ Error during resolution compression: {e}")
@@ -168,8 +513,9 @@ class VideoProcessor:
         finally:
             out.release()
 
-    def compress_combined(self, output_path, skip_rate=2, scale_percent=50):
-        """Compress video using both frame skipping and resolution reduction"""
+    def compress_combined(self, output_path, skip_rate=2, scale_percent=50, dedup=False,
+                          dedup_threshold=DEFAULT_DEDUP_THRESHOLD, roi=None):
+        """Compress video using both frame skipping and resolution reduction, optionally collapsing duplicate frames"""
         if self.cap is None or not self.cap.isOpened():
             print("✗ No video loaded or video cannot be opened.")
             return False
@@ -180,12 +526,14 @@ class VideoProcessor:
 
         print(f"Starting combined compression (skip every {skip_rate} frames, {scale_percent}% scale) to {output_path}...")
 
-        new_width = int(self.video_properties['width'] * scale_percent / 100)
-        new_height = int(self.video_properties['height'] * scale_percent / 100)
+        width, height = self._frame_size(roi)
+        new_width = int(width * scale_percent / 100)
+        new_height = int(height * scale_percent / 100)
         new_fps = self.video_properties['fps'] / skip_rate
 
         out = self._get_video_writer(output_path, new_fps, new_width, new_height)
         self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+        self._reset_dedup()
         frame_idx = 0
         processed_frames = 0
 
@@ -194,13 +542,20 @@ class VideoProcessor:
                 ret, frame = self.cap.read()
                 if not ret:
                     break
+                frame = self._apply_roi(frame, roi)
 
-                if frame_idx % skip_rate == 0:
+                if frame_idx % skip_rate == 0 and not (dedup and self._is_duplicate(frame, dedup_threshold)):
                     resized_frame = cv.resize(frame, (new_width, new_height), interpolation=cv.INTER_AREA)
                     out.write(resized_frame)
                     processed_frames += 1
                 frame_idx += 1
-            print(f"✓ Combined compression complete. Wrote {processed_frames} frames.")
+                self._report_progress(frame_idx)
+            out.release()
+            if not self._apply_frame_runs(output_path):
+                print("✗ Combined compression failed: deduplicated frames could not be retimed.")
+                return False
+            print(f"✓ Combined compression complete. Wrote {processed_frames} frames"
+                  f" ({self.duplicates_removed} duplicates removed).")
             return True
         except Exception as e:
             print(f"✗ Error during combined compression: {e}")
@@ -208,34 +563,180 @@ class VideoProcessor:
         finally:
             out.release()
 
+    def generate_thumbnails(self, output_path, count=10, columns=5, thumb_width=160):
+        """Build a sprite sheet of `count` evenly spaced frames plus a JSON index (same name, .json suffix).
+        Each seek decodes forward from the previous keyframe to the requested frame, so a thumbnail costs
+        at most one keyframe interval of decoding and the total grows with `count`, not the video length.
+        Timestamps in the index are the decoded frames' own presentation times.
+        """
+        if self.cap is None or not self.cap.isOpened():
+            print("✗ No video loaded or video cannot be opened.")
+            return False
+
+        if Path(output_path).suffix.lower() not in SPRITE_EXTENSIONS:
+            print(f"✗ Sprite sheet must be one of {', '.join(SPRITE_EXTENSIONS)}: {output_path}")
+            return False
+
+        if count < 1 or columns < 1 or thumb_width < 1:
+            print("✗ Count, columns and thumbnail width must be at least 1.")
+            return False
+
+        frame_count = self.video_properties['frame_count']
+        if frame_count < 1:
+            print("✗ Video reports no frames.")
+            return False
+
+        print(f"Generating {count} thumbnails to {output_path}...")
+
+        thumb_height = max(1, int(self.video_properties['height'] * thumb_width / self.video_properties['width']))
+        # sample the middle of each of `count` equal segments so the first/last shots are not black fades
+        indices = sorted(set(int((i + 0.5) * frame_count / count) for i in range(count)))
+
+        thumbs = []
+        entries = []
+        try:
+            for idx in indices:
+                self.cap.set(cv.CAP_PROP_POS_FRAMES, idx)
+                ret, frame = self.cap.read()
+                if not ret:
+                    continue
+
+                thumbs.append(cv.resize(frame, (thumb_width, thumb_height), interpolation=cv.INTER_AREA))
+                # POS_MSEC is the pts of the frame just read, which stays correct for retimed (deduplicated) outputs
+                entries.append({'frame': idx, 'time': self.cap.get(cv.CAP_PROP_POS_MSEC) / 1000})
+
+            if not thumbs:
+                print("✗ Could not read any frames for thumbnails.")
+                return False
+
+            columns = min(columns, len(thumbs))
+            rows = -(-len(thumbs) // columns)
+            sheet = np.zeros((rows * thumb_height, columns * thumb_width, 3), dtype=np.uint8)
+            for i, (thumb, entry) in enumerate(zip(thumbs, entries)):
+                row, col = divmod(i, columns)
+                x, y = col * thumb_width, row * thumb_height
+                sheet[y:y + thumb_height, x:x + thumb_width] = thumb
+                entry.update({'x': x, 'y': y, 'width': thumb_width, 'height': thumb_height})
+
+            if not cv.imwrite(str(output_path), sheet):
+                raise IOError(f"Could not write sprite sheet to {output_path}")
+
+            index_path = Path(output_path).with_suffix('.json')
+            with open(index_path, 'w') as f:
+                json.dump({'sprite': Path(output_path).name, 'columns': columns, 'rows': rows,
+                           'thumbnails': entries}, f, indent=2)
+
+            print(f"✓ Thumbnail generation complete. Wrote {len(thumbs)} thumbnails and index {index_path}.")
+            return True
+        except Exception as e:
+            print(f"✗ Error during thumbnail generation: {e}")
+            return False
+
+    def mux_source_audio(self, output_path):
+        """Copy the source audio track into output_path without re-encoding.
+        Both streams are stream-copied into a new container, so the cost is a remux rather than a decode.
+        Frame-skipped outputs keep the source duration (fps is divided by the skip rate), so the audio stays aligned.
+        Only if the container rejects the source audio codec is the audio (and only the audio) encoded to AAC.
+        Deduplicated outputs are retimed in their MP4 sample table beforehand, so this copy is the only pass that
+        rewrites the output and it carries that timing over unchanged.
+        Returns True once muxed, None if the source has no audio track and False if the mux fails;
+        output_path is left untouched unless True.
+        """
+        if not self.video_path:
+            print("✗ No video loaded.")
+            return False
+
+        ffmpeg = _find_ffmpeg()
+        if ffmpeg is None:
+            print("✗ ffmpeg not found; output will have no audio.")
+            return False
+
+        output_path = Path(output_path)
+        tmp_path = output_path.with_name(output_path.stem + '_mux' + output_path.suffix)
+        base_cmd = [ffmpeg, '-y', '-loglevel', 'error',
+                    '-i', str(output_path), '-i', str(self.video_path),
+                    '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy']
+
+        print(f"Muxing source audio into {output_path}...")
+        try:
+            result = subprocess.run(base_cmd + ['-c:a', 'copy', str(tmp_path)], capture_output=True)
+            stderr = result.stderr.decode(errors='replace')
+            if result.returncode != 0 and NO_AUDIO_ERROR in stderr:
+                print("Source has no audio track; output stays silent.")
+                return None
+            if result.returncode != 0 and any(msg in stderr for msg in AUDIO_CODEC_ERRORS):
+                print("Source audio codec not supported in the output container; encoding audio to AAC...")
+                result = subprocess.run(base_cmd + ['-c:a', 'aac', str(tmp_path)], capture_output=True)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode(errors='replace').strip())
+
+            os.replace(tmp_path, output_path)
+            print("✓ Audio mux complete.")
+            return True
+        except Exception as e:
+            print(f"✗ Error during audio mux: {e}")
+            return False
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
     def close(self):
         """Release video capture"""
         if self.cap is not None:
             self.cap.release()
             print("Video capture released.")
 
-    def compress_to(self, output_path, method='combined', skip_rate=2, scale_percent=50):
+    def compress_to(self, output_path, method='combined', skip_rate=2, scale_percent=50, keep_audio=True,
+                    dedup=False, dedup_threshold=DEFAULT_DEDUP_THRESHOLD, crop=None):
         """Convenience wrapper to compress loaded video to output_path using chosen method.
+        dedup collapses runs of (near-)identical frames; see compress_with_frame_skip.
+        crop is None, 'auto' (strip black borders found by detect_borders) or an (x, y, width, height) region.
+        When keep_audio is set, the source audio track is stream-copied into the output afterwards.
+        A failed mux leaves the silent video in place and sets audio_muxed to False
+        (True on success, None when audio was not requested or the source has no audio track).
         Returns True on success, False otherwise.
         """
         if self.cap is None or not self.cap.isOpened():
             print("✗ No video loaded or video cannot be opened.")
             return False
 
+        try:
+            roi = self._resolve_roi(crop)
+        except (TypeError, ValueError) as e:
+            print(f"✗ Invalid crop region: {e}")
+            return False
+
         if method == 'frameskip':
-            return self.compress_with_frame_skip(output_path, skip_rate=skip_rate)
+            ok = self.compress_with_frame_skip(output_path, skip_rate=skip_rate,
+                                               dedup=dedup, dedup_threshold=dedup_threshold, roi=roi)
         elif method == 'resolution':
-            return self.compress_with_resolution(output_path, scale_percent=scale_percent)
+            ok = self.compress_with_resolution(output_path, scale_percent=scale_percent,
+                                               dedup=dedup, dedup_threshold=dedup_threshold, roi=roi)
         elif method == 'combined':
-            return self.compress_combined(output_path, skip_rate=skip_rate, scale_percent=scale_percent)
+            ok = self.compress_combined(output_path, skip_rate=skip_rate, scale_percent=scale_percent,
+                                        dedup=dedup, dedup_threshold=dedup_threshold, roi=roi)
         else:
             print(f"✗ Unknown compression method: {method}")
             return False
 
+        self.audio_muxed = None
+        if ok and keep_audio:
+            self.audio_muxed = self.mux_source_audio(output_path)
+            if self.audio_muxed is False:
+                print(f"⚠ Audio could not be added; {output_path} is silent.")
+        return ok
+
 
-def compress_video_file(input_path, output_dir, method='combined', skip_rate=2, scale_percent=50):
+def compress_video_file(input_path, output_dir, method='combined', skip_rate=2, scale_percent=50, keep_audio=True,
+                        dedup=False, dedup_threshold=DEFAULT_DEDUP_THRESHOLD, crop=None, thumbnails=True,
+                        progress_callback=None):
     """High level helper: load input_path, compress to output_dir, return output_path and metadata dict.
-    Metadata includes: path, filesize (bytes), fps, frame_count, width, height, duration
+    progress_callback, if given, is called with the fraction (0..1) of source frames processed.
+    With thumbnails, a sprite sheet and its JSON index are generated from the compressed output.
+    Metadata includes: path, filesize (bytes), fps, frame_count, width, height, duration, duplicates_removed,
+    sprite, sprite_index (None when thumbnails are disabled or could not be generated),
+    audio_muxed (True if the source audio was added, False if that mux failed,
+    None if keep_audio was off or the source has no audio)
     """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -247,14 +748,18 @@ def compress_video_file(input_path, output_dir, method='combined', skip_rate=2,
     out_path = str(output_dir / name)
 
     proc = VideoProcessor()
+    proc.progress_callback = progress_callback
     try:
         ok = proc.load_video(str(src))
         if not ok:
             raise RuntimeError("Failed to load input video")
 
-        ok = proc.compress_to(out_path, method=method, skip_rate=skip_rate, scale_percent=scale_percent)
+        ok = proc.compress_to(out_path, method=method, skip_rate=skip_rate, scale_percent=scale_percent,
+                              keep_audio=keep_audio, dedup=dedup, dedup_threshold=dedup_threshold, crop=crop)
         if not ok:
             raise RuntimeError("Compression failed")
+        duplicates_removed = proc.duplicates_removed
+        audio_muxed = proc.audio_muxed
     finally:
         proc.close()
 
@@ -272,6 +777,18 @@ def compress_video_file(input_path, output_dir, method='combined', skip_rate=2,
 
     filesize = (Path(out_path).stat().st_size)
 
+    sprite_path = None
+    index_path = None
+    if thumbnails:
+        sprite = output_dir / (Path(out_path).stem + "_sprite.jpg")
+        thumbs = VideoProcessor()
+        try:
+            if thumbs.load_video(out_path) and thumbs.generate_thumbnails(str(sprite)):
+                sprite_path = str(sprite)
+                index_path = str(sprite.with_suffix('.json'))
+        finally:
+            thumbs.close()
+
     metadata = {
         'path': out_path,
         'filesize': filesize,
@@ -280,6 +797,10 @@ def compress_video_file(input_path, output_dir, method='combined', skip_rate=2,
         'width': width,
         'height': height,
         'duration': duration,
+        'duplicates_removed': duplicates_removed,
+        'sprite': sprite_path,
+        'sprite_index': index_path,
+        'audio_muxed': audio_muxed,
     }
 
     return out_path, metadata